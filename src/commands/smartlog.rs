@@ -22,7 +22,7 @@ pub use graph::{make_smartlog_graph, SmartlogGraph};
 pub use render::{render_graph, SmartlogOptions};
 
 mod graph {
-    use std::collections::HashMap;
+    use std::collections::{HashMap, HashSet};
     use std::convert::TryFrom;
     use std::ops::Deref;
 
@@ -127,55 +127,93 @@ mod graph {
         public_commits: &CommitSet,
         active_heads: &CommitSet,
     ) -> eyre::Result<SmartlogGraph<'repo>> {
-        let mut graph: HashMap<NonZeroOid, Node> = {
-            let mut result = HashMap::new();
-            for vertex in active_heads.iter()? {
+        // Collect the paths for all heads into a single set first, so that
+        // commits shared between paths (such as their merge-bases with the main
+        // branch) are only resolved once below.
+        let graph_commits = {
+            // Heads which are already part of the main branch are their own
+            // merge-base with it, so their path consists of just themselves.
+            // Find all of them with one set operation, and only search for
+            // paths from the remaining heads.
+            let public_heads = active_heads.intersection(public_commits);
+            let draft_heads = active_heads.difference(public_commits);
+
+            let mut result = public_heads;
+            for vertex in draft_heads.iter()? {
                 let vertex = vertex?;
                 let path_to_main_branch =
                     dag.find_path_to_main_branch(effects, CommitSet::from(vertex.clone()))?;
                 let path_to_main_branch = match path_to_main_branch {
                     Some(path_to_main_branch) => path_to_main_branch,
-                    None => CommitSet::from(vertex.clone()),
+                    None => CommitSet::from(vertex),
                 };
+                result = result.union(&path_to_main_branch);
+            }
+            dag.query().sort(&result)?
+        };
 
-                for vertex in path_to_main_branch.iter_rev()? {
-                    let vertex = vertex?;
-                    let oid = NonZeroOid::try_from(vertex.clone())?;
-
-                    let object = match repo.find_commit(oid)? {
-                        Some(commit) => NodeObject::Commit { commit },
-                        None => {
-                            // Assume that this commit was garbage collected.
-                            NodeObject::GarbageCollected { oid }
-                        }
-                    };
-
-                    result.insert(
-                        oid,
-                        Node {
-                            object,
-                            parent: None,         // populated below
-                            children: Vec::new(), // populated below
-                            is_main: public_commits.contains(&vertex)?,
-                            is_obsolete: dag.obsolete_commits.contains(&vertex)?,
-                        },
-                    );
-                }
+        let mut graph: HashMap<NonZeroOid, Node> = {
+            // The number of nodes is known in advance, so allocate the table
+            // once rather than growing it as nodes are inserted.
+            let mut result = HashMap::with_capacity(graph_commits.count()?);
+            for vertex in graph_commits.iter()? {
+                let oid = NonZeroOid::try_from(vertex?)?;
+                let object = match repo.find_commit(oid)? {
+                    Some(commit) => NodeObject::Commit { commit },
+                    None => {
+                        // Assume that this commit was garbage collected.
+                        NodeObject::GarbageCollected { oid }
+                    }
+                };
+
+                result.insert(
+                    oid,
+                    Node {
+                        object,
+                        parent: None,         // populated below
+                        children: Vec::new(), // populated below
+                        is_main: false,       // populated below
+                        is_obsolete: false,   // populated below
+                    },
+                );
             }
             result
         };
 
+        // Classify all nodes at once with the DAG's set operations, rather
+        // than issuing separate membership queries for each node.
+        {
+            let main_commits: HashSet<NonZeroOid> =
+                commit_set_to_vec(&graph_commits.intersection(public_commits))?
+                    .into_iter()
+                    .collect();
+            let obsolete_commits: HashSet<NonZeroOid> =
+                commit_set_to_vec(&graph_commits.intersection(&dag.obsolete_commits))?
+                    .into_iter()
+                    .collect();
+            for (oid, node) in graph.iter_mut() {
+                node.is_main = main_commits.contains(oid);
+                node.is_obsolete = obsolete_commits.contains(oid);
+            }
+        }
+
         // Find immediate parent-child links.
         let links: Vec<(NonZeroOid, NonZeroOid)> = {
-            let non_main_node_oids =
-                graph.iter().filter_map(
-                    |(child_oid, node)| if !node.is_main { Some(child_oid) } else { None },
-                );
-
-            let mut links = Vec::new();
-            for child_oid in non_main_node_oids {
-                let parent_vertexes = dag.query().parents(CommitSet::from(*child_oid))?;
-                let parent_oids = commit_set_to_vec(&parent_vertexes)?;
+            let non_main_nodes = graph.iter().filter(|(_child_oid, node)| !node.is_main);
+
+            // Most commits have exactly one parent, so this is usually enough
+            // to hold every link without reallocating.
+            let mut links = Vec::with_capacity(graph.len());
+            for (child_oid, node) in non_main_nodes {
+                // Read the parents off of the commit object we already have,
+                // rather than allocating a set for each node to query the DAG.
+                let parent_oids = match &node.object {
+                    NodeObject::Commit { commit } => commit.get_parent_oids(),
+                    NodeObject::GarbageCollected { oid: _ } => {
+                        let parent_vertexes = dag.query().parents(CommitSet::from(*child_oid))?;
+                        commit_set_to_vec(&parent_vertexes)?
+                    }
+                };
                 for parent_oid in parent_oids {
                     if graph.contains_key(&parent_oid) {
                         links.push((*child_oid, parent_oid))
@@ -210,7 +248,7 @@ mod graph {
             .collect();
         for node in graph.nodes.values_mut() {
             node.children
-                .sort_by_key(|child_oid| (commit_times[child_oid], child_oid.to_string()));
+                .sort_by_key(|child_oid| (commit_times[child_oid], *child_oid));
         }
     }
 
@@ -256,6 +294,7 @@ mod graph {
 
 mod render {
     use std::cmp::Ordering;
+    use std::collections::HashSet;
 
     use cursive::theme::Effect;
     use cursive::utils::markup::StyledString;
@@ -266,8 +305,8 @@ mod render {
     use crate::core::effects::Effects;
     use crate::core::formatting::set_effect;
     use crate::core::formatting::{Glyphs, StyledStringBuilder};
-    use crate::core::node_descriptors::{render_node_descriptors, NodeDescriptor};
-    use crate::git::{NonZeroOid, Repo};
+    use crate::core::node_descriptors::{render_node_descriptors, NodeDescriptor, NodeObject};
+    use crate::git::NonZeroOid;
 
     use super::graph::SmartlogGraph;
 
@@ -278,12 +317,7 @@ mod render {
     ///
     /// Returns the list such that the topologically-earlier subgraphs are first in
     /// the list (i.e. those that would be rendered at the bottom of the smartlog).
-    fn split_commit_graph_by_roots(
-        effects: &Effects,
-        repo: &Repo,
-        dag: &Dag,
-        graph: &SmartlogGraph,
-    ) -> Vec<NonZeroOid> {
+    fn split_commit_graph_by_roots(dag: &Dag, graph: &SmartlogGraph) -> Vec<NonZeroOid> {
         let mut root_commit_oids: Vec<NonZeroOid> = graph
             .iter()
             .filter(|(_oid, node)| node.parent.is_none())
@@ -292,32 +326,44 @@ mod render {
             .collect();
 
         let compare = |lhs_oid: &NonZeroOid, rhs_oid: &NonZeroOid| -> Ordering {
-            let lhs_commit = repo.find_commit(*lhs_oid);
-            let rhs_commit = repo.find_commit(*rhs_oid);
-
-            let (lhs_commit, rhs_commit) = match (lhs_commit, rhs_commit) {
-                (Ok(Some(lhs_commit)), Ok(Some(rhs_commit))) => (lhs_commit, rhs_commit),
+            // The commits were already resolved while building the graph, so
+            // reuse them rather than looking them up again for every
+            // comparison.
+            let (lhs_commit, rhs_commit) = match (&graph[lhs_oid].object, &graph[rhs_oid].object) {
+                (
+                    NodeObject::Commit { commit: lhs_commit },
+                    NodeObject::Commit { commit: rhs_commit },
+                ) => (lhs_commit, rhs_commit),
                 _ => return lhs_oid.cmp(rhs_oid),
             };
 
-            let merge_base_oid = dag.get_one_merge_base_oid(effects, repo, *lhs_oid, *rhs_oid);
-            let merge_base_oid = match merge_base_oid {
-                Err(_) => return lhs_oid.cmp(rhs_oid),
-                Ok(merge_base_oid) => merge_base_oid,
+            // Only the ancestry relationship between the two roots matters, and
+            // the DAG's segment index answers that directly, without having to
+            // compute a merge-base.
+            let is_ancestor = |ancestor_oid: &NonZeroOid, descendant_oid: &NonZeroOid| {
+                dag.query().is_ancestor(
+                    CommitVertex::from(*ancestor_oid),
+                    CommitVertex::from(*descendant_oid),
+                )
             };
-
-            match merge_base_oid {
+            match is_ancestor(lhs_oid, rhs_oid) {
+                Err(_) => return lhs_oid.cmp(rhs_oid),
                 // lhs was topologically first, so it should be sorted earlier in the list.
-                Some(merge_base_oid) if merge_base_oid == *lhs_oid => Ordering::Less,
-                Some(merge_base_oid) if merge_base_oid == *rhs_oid => Ordering::Greater,
-
-                // The commits were not orderable (pathlogical situation). Let's
-                // just order them by timestamp in that case to produce a consistent
-                // and reasonable guess at the intended topological ordering.
-                Some(_) | None => match lhs_commit.get_time().cmp(&rhs_commit.get_time()) {
-                    result @ Ordering::Less | result @ Ordering::Greater => result,
-                    Ordering::Equal => lhs_oid.cmp(rhs_oid),
-                },
+                Ok(true) => return Ordering::Less,
+                Ok(false) => {}
+            }
+            match is_ancestor(rhs_oid, lhs_oid) {
+                Err(_) => return lhs_oid.cmp(rhs_oid),
+                Ok(true) => return Ordering::Greater,
+                Ok(false) => {}
+            }
+
+            // The commits were not orderable (pathlogical situation). Let's
+            // just order them by timestamp in that case to produce a consistent
+            // and reasonable guess at the intended topological ordering.
+            match lhs_commit.get_time().cmp(&rhs_commit.get_time()) {
+                result @ Ordering::Less | result @ Ordering::Greater => result,
+                Ordering::Equal => lhs_oid.cmp(rhs_oid),
             }
         };
 
@@ -325,98 +371,153 @@ mod render {
         root_commit_oids
     }
 
+    /// A node waiting to be rendered by `get_child_output`.
+    struct PendingNode<'a> {
+        /// The OID of the node.
+        oid: NonZeroOid,
+
+        /// The depth of the node in the subtree being rendered, where the root
+        /// of the subtree has depth 0.
+        depth: usize,
+
+        /// The character (if any) which this node's lines are indented by,
+        /// relative to its parent's lines.
+        indent: Option<&'a str>,
+
+        /// The line connecting this node to its parent, to be rendered before
+        /// the node itself.
+        connector_line: Option<StyledString>,
+
+        /// The character to use for the line continuing past this node's last
+        /// child.
+        last_child_line_char: Option<&'a str>,
+    }
+
     #[instrument(skip(commit_descriptors, graph))]
     fn get_child_output(
         glyphs: &Glyphs,
         graph: &SmartlogGraph,
-        root_oids: &[NonZeroOid],
+        root_oids: &HashSet<NonZeroOid>,
         commit_descriptors: &mut [&mut dyn NodeDescriptor],
         head_oid: Option<NonZeroOid>,
         current_oid: NonZeroOid,
         last_child_line_char: Option<&str>,
     ) -> eyre::Result<Vec<StyledString>> {
-        let current_node = &graph[&current_oid];
-        let is_head = Some(current_oid) == head_oid;
-
-        let text = render_node_descriptors(&current_node.object, commit_descriptors)?;
-        let cursor = match (current_node.is_main, current_node.is_obsolete, is_head) {
-            (false, false, false) => glyphs.commit_visible,
-            (false, false, true) => glyphs.commit_visible_head,
-            (false, true, false) => glyphs.commit_obsolete,
-            (false, true, true) => glyphs.commit_obsolete_head,
-            (true, false, false) => glyphs.commit_main,
-            (true, false, true) => glyphs.commit_main_head,
-            (true, true, false) => glyphs.commit_main_obsolete,
-            (true, true, true) => glyphs.commit_main_obsolete_head,
-        };
-
-        let first_line = {
-            let mut first_line = StyledString::new();
-            first_line.append_plain(cursor);
-            first_line.append_plain(" ");
-            first_line.append(text);
-            if is_head {
-                set_effect(first_line, Effect::Bold)
+        // Render the subtree iteratively rather than recursively, since long
+        // stacks of commits could otherwise overflow the call stack. Children
+        // are pushed in reverse order so that they're popped in order.
+        //
+        // Rather than each pending node carrying a copy of its full line
+        // prefix, the prefix of the node being rendered is kept in a single
+        // string, along with its length at each depth, so that it can be
+        // truncated back to the parent's prefix when a node is popped.
+        let mut stack = vec![PendingNode {
+            oid: current_oid,
+            depth: 0,
+            indent: None,
+            connector_line: None,
+            last_child_line_char,
+        }];
+        let mut prefix = String::new();
+        let mut prefix_lens: Vec<usize> = Vec::new();
+        let add_prefix = |prefix: &str, line: StyledString| -> StyledString {
+            if prefix.is_empty() {
+                line
             } else {
-                first_line
+                StyledStringBuilder::new()
+                    .append_plain(prefix)
+                    .append(line)
+                    .build()
             }
         };
 
-        let mut lines = vec![first_line];
-        let children: Vec<_> = current_node
-            .children
-            .iter()
-            .filter(|child_oid| graph.contains_key(child_oid))
-            .copied()
-            .collect();
-        for (child_idx, child_oid) in children.iter().enumerate() {
-            if root_oids.contains(child_oid) {
-                // Will be rendered by the parent.
-                continue;
+        let mut lines = Vec::new();
+        while let Some(PendingNode {
+            oid: current_oid,
+            depth,
+            indent,
+            connector_line,
+            last_child_line_char,
+        }) = stack.pop()
+        {
+            prefix_lens.truncate(depth);
+            prefix.truncate(prefix_lens.last().copied().unwrap_or_default());
+            if let Some(connector_line) = connector_line {
+                lines.push(add_prefix(&prefix, connector_line));
             }
-
-            if child_idx == children.len() - 1 {
-                let line = match last_child_line_char {
-                    Some(_) => StyledString::plain(format!(
-                        "{}{}",
-                        glyphs.line_with_offshoot, glyphs.slash
-                    )),
-
-                    None => StyledString::plain(glyphs.line.to_string()),
-                };
-                lines.push(line)
-            } else {
-                lines.push(StyledString::plain(format!(
-                    "{}{}",
-                    glyphs.line_with_offshoot, glyphs.slash
-                )))
+            if let Some(indent) = indent {
+                prefix.push_str(indent);
+                prefix.push(' ');
             }
+            prefix_lens.push(prefix.len());
+
+            let current_node = &graph[&current_oid];
+            let is_head = Some(current_oid) == head_oid;
+
+            let text = render_node_descriptors(&current_node.object, commit_descriptors)?;
+            let cursor = match (current_node.is_main, current_node.is_obsolete, is_head) {
+                (false, false, false) => glyphs.commit_visible,
+                (false, false, true) => glyphs.commit_visible_head,
+                (false, true, false) => glyphs.commit_obsolete,
+                (false, true, true) => glyphs.commit_obsolete_head,
+                (true, false, false) => glyphs.commit_main,
+                (true, false, true) => glyphs.commit_main_head,
+                (true, true, false) => glyphs.commit_main_obsolete,
+                (true, true, true) => glyphs.commit_main_obsolete_head,
+            };
 
-            let child_output = get_child_output(
-                glyphs,
-                graph,
-                root_oids,
-                commit_descriptors,
-                head_oid,
-                *child_oid,
-                None,
-            )?;
-            for child_line in child_output {
-                let line = if child_idx == children.len() - 1 {
+            let first_line = {
+                let mut first_line = StyledString::new();
+                first_line.append_plain(cursor);
+                first_line.append_plain(" ");
+                first_line.append(text);
+                if is_head {
+                    set_effect(first_line, Effect::Bold)
+                } else {
+                    first_line
+                }
+            };
+            lines.push(add_prefix(&prefix, first_line));
+
+            let children: Vec<_> = current_node
+                .children
+                .iter()
+                .filter(|child_oid| graph.contains_key(child_oid))
+                .copied()
+                .collect();
+            for (child_idx, child_oid) in children.iter().enumerate().rev() {
+                if root_oids.contains(child_oid) {
+                    // Will be rendered by the parent.
+                    continue;
+                }
+
+                let (connector_line, child_indent) = if child_idx == children.len() - 1 {
                     match last_child_line_char {
-                        Some(last_child_line_char) => StyledStringBuilder::new()
-                            .append_plain(format!("{} ", last_child_line_char))
-                            .append(child_line)
-                            .build(),
-                        None => child_line,
+                        Some(last_child_line_char) => (
+                            StyledString::plain(format!(
+                                "{}{}",
+                                glyphs.line_with_offshoot, glyphs.slash
+                            )),
+                            Some(last_child_line_char),
+                        ),
+                        None => (StyledString::plain(glyphs.line.to_string()), None),
                     }
                 } else {
-                    StyledStringBuilder::new()
-                        .append_plain(format!("{} ", glyphs.line))
-                        .append(child_line)
-                        .build()
+                    (
+                        StyledString::plain(format!(
+                            "{}{}",
+                            glyphs.line_with_offshoot, glyphs.slash
+                        )),
+                        Some(glyphs.line),
+                    )
                 };
-                lines.push(line)
+                stack.push(PendingNode {
+                    oid: *child_oid,
+                    depth: depth + 1,
+                    indent: child_indent,
+                    connector_line: Some(connector_line),
+                    last_child_line_char: None,
+                });
             }
         }
         Ok(lines)
@@ -434,24 +535,32 @@ mod render {
     ) -> eyre::Result<Vec<StyledString>> {
         let mut lines = Vec::new();
 
-        // Determine if the provided OID has the provided parent OID as a parent.
+        // Look up each root's parents once up front, since they're needed
+        // both for the line above the root and for the line continuing past
+        // the previous root.
+        let root_parents: Vec<CommitSet> = root_oids
+            .iter()
+            .map(|root_oid| dag.query().parents(CommitSet::from(*root_oid)))
+            .collect::<eden_dag::Result<_>>()?;
+
+        // Determine if the root at the provided index has the provided parent
+        // OID as a parent.
         //
         // This returns `true` in strictly more cases than checking `graph`,
         // since there may be links between adjacent main branch commits which
         // are not reflected in `graph`.
-        let has_real_parent = |oid: NonZeroOid, parent_oid: NonZeroOid| -> eyre::Result<bool> {
-            let parents = dag.query().parents(CommitSet::from(oid))?;
-            let result = parents.contains(&CommitVertex::from(parent_oid))?;
+        let has_real_parent = |root_idx: usize, parent_oid: NonZeroOid| -> eyre::Result<bool> {
+            let result = root_parents[root_idx].contains(&CommitVertex::from(parent_oid))?;
             Ok(result)
         };
 
+        // Every child visited while rendering is checked against the roots, so
+        // index them once rather than scanning the list for each child.
+        let root_oid_set: HashSet<NonZeroOid> = root_oids.iter().copied().collect();
+
         for (root_idx, root_oid) in root_oids.iter().enumerate() {
-            if !dag
-                .query()
-                .parents(CommitSet::from(*root_oid))?
-                .is_empty()?
-            {
-                let line = if root_idx > 0 && has_real_parent(*root_oid, root_oids[root_idx - 1])? {
+            if !root_parents[root_idx].is_empty()? {
+                let line = if root_idx > 0 && has_real_parent(root_idx, root_oids[root_idx - 1])? {
                     StyledString::plain(glyphs.line.to_owned())
                 } else {
                     StyledString::plain(glyphs.vertical_ellipsis.to_owned())
@@ -466,20 +575,17 @@ mod render {
             let last_child_line_char = {
                 if root_idx == root_oids.len() - 1 {
                     None
+                } else if has_real_parent(root_idx + 1, *root_oid)? {
+                    Some(glyphs.line)
                 } else {
-                    let next_root_oid = root_oids[root_idx + 1];
-                    if has_real_parent(next_root_oid, *root_oid)? {
-                        Some(glyphs.line)
-                    } else {
-                        Some(glyphs.vertical_ellipsis)
-                    }
+                    Some(glyphs.vertical_ellipsis)
                 }
             };
 
             let child_output = get_child_output(
                 glyphs,
                 graph,
-                root_oids,
+                &root_oid_set,
                 commit_descriptors,
                 head_oid,
                 *root_oid,
@@ -495,13 +601,12 @@ mod render {
     #[instrument(skip(commit_descriptors, graph))]
     pub fn render_graph(
         effects: &Effects,
-        repo: &Repo,
         dag: &Dag,
         graph: &SmartlogGraph,
         head_oid: Option<NonZeroOid>,
         commit_descriptors: &mut [&mut dyn NodeDescriptor],
     ) -> eyre::Result<Vec<StyledString>> {
-        let root_oids = split_commit_graph_by_roots(effects, repo, dag, graph);
+        let root_oids = split_commit_graph_by_roots(dag, graph);
         let lines = get_output(
             effects.get_glyphs(),
             dag,
@@ -558,7 +663,6 @@ pub fn smartlog(
 
     let lines = render_graph(
         effects,
-        &repo,
         &dag,
         &graph,
         references_snapshot.head_oid,
@@ -43,7 +43,6 @@ fn render_cursor_smartlog(
     let graph = make_smartlog_graph(effects, repo, &dag, event_replayer, event_cursor, true)?;
     let result = render_graph(
         effects,
-        repo,
         &dag,
         &graph,
         references_snapshot.head_oid,
@@ -7,8 +7,8 @@ use std::collections::HashMap;
 use std::convert::TryFrom;
 use std::iter::FromIterator;
 
-use eden_dag::ops::DagPersistent;
-use eden_dag::DagAlgorithm;
+use eden_dag::ops::{DagPersistent, IdConvert};
+use eden_dag::{DagAlgorithm, Group};
 use eyre::Context;
 use itertools::Itertools;
 use tracing::{instrument, trace, warn};
@@ -130,7 +130,8 @@ impl Dag {
         event_cursor: EventCursor,
         references_snapshot: &RepoReferencesSnapshot,
     ) -> eyre::Result<Self> {
-        let observed_commits = event_replayer.get_cursor_oids(event_cursor);
+        let commit_activity_statuses =
+            event_replayer.get_cursor_commit_activity_statuses(event_cursor);
         let RepoReferencesSnapshot {
             head_oid,
             main_branch_oid,
@@ -138,16 +139,11 @@ impl Dag {
         } = references_snapshot;
 
         let obsolete_commits = CommitSet::from_iter(
-            observed_commits
+            commit_activity_statuses
                 .iter()
-                .copied()
-                .filter(|commit_oid| {
-                    match event_replayer
-                        .get_cursor_commit_activity_status(event_cursor, *commit_oid)
-                    {
-                        CommitActivityStatus::Active | CommitActivityStatus::Inactive => false,
-                        CommitActivityStatus::Obsolete => true,
-                    }
+                .filter_map(|(commit_oid, status)| match status {
+                    CommitActivityStatus::Active | CommitActivityStatus::Inactive => None,
+                    CommitActivityStatus::Obsolete => Some(*commit_oid),
                 })
                 .map(CommitVertex::from)
                 .map(Ok)
@@ -159,8 +155,12 @@ impl Dag {
         let dag = eden_dag::Dag::open(&dag_dir)
             .wrap_err_with(|| format!("Opening DAG directory at: {:?}", &dag_dir))?;
 
-        let observed_commits =
-            CommitSet::from_iter(observed_commits.into_iter().map(CommitVertex::from).map(Ok));
+        let observed_commits = CommitSet::from_iter(
+            commit_activity_statuses
+                .into_iter()
+                .map(|(commit_oid, _status)| CommitVertex::from(commit_oid))
+                .map(Ok),
+        );
         let head_commit = match head_oid {
             Some(head_oid) => CommitSet::from(*head_oid),
             None => CommitSet::empty(),
@@ -203,6 +203,39 @@ impl Dag {
         master_heads: CommitSet,
         non_master_heads: CommitSet,
     ) -> eden_dag::Result<()> {
+        // The DAG is persisted between invocations, so in the common case
+        // every head has already been added by a previous sync. Skip walking
+        // and flushing the DAG in that case.
+        //
+        // A master head which is known to the DAG may still need to be
+        // flushed: if it was previously added as a non-master head (such as
+        // when the main branch is fast-forwarded to a commit on a feature
+        // branch), flushing is what moves it into the master group.
+        //
+        // When there are new heads, these lookups duplicate the ones done by
+        // `add_heads_and_flush`, so stop at the first head which needs to be
+        // added.
+        let is_synced = || -> eden_dag::Result<bool> {
+            for vertex in master_heads.iter()? {
+                if self
+                    .inner
+                    .vertex_id_with_max_group(&vertex?, Group::MASTER)?
+                    .is_none()
+                {
+                    return Ok(false);
+                }
+            }
+            for vertex in non_master_heads.iter()? {
+                if !self.inner.contains_vertex_name(&vertex?)? {
+                    return Ok(false);
+                }
+            }
+            Ok(true)
+        };
+        if is_synced()? {
+            return Ok(());
+        }
+
         let (effects, _progress) = effects.start_operation(OperationType::UpdateCommitGraph);
         let _effects = effects;
 
@@ -297,7 +330,7 @@ impl Dag {
         let vertex = self.inner.gca_one(set).wrap_err("Computing merge-base")?;
         match vertex {
             None => Ok(None),
-            Some(vertex) => Ok(Some(vertex.to_hex().parse()?)),
+            Some(vertex) => Ok(Some(NonZeroOid::try_from(vertex)?)),
         }
     }
 
@@ -312,6 +345,19 @@ impl Dag {
         parent_oid: NonZeroOid,
         child_oid: NonZeroOid,
     ) -> eyre::Result<Vec<NonZeroOid>> {
+        // This is common when the child is an ancestor of the commit which
+        // the caller computed the merge-base against, in which case the range
+        // consists of just that commit and there's nothing to walk. If the
+        // commit isn't in the DAG, fall through so that the range query
+        // reports the error.
+        if parent_oid == child_oid
+            && self
+                .inner
+                .contains_vertex_name(&CommitVertex::from(child_oid))?
+        {
+            return Ok(vec![child_oid]);
+        }
+
         let (effects, _progress) = effects.start_operation(OperationType::WalkCommits);
         let _effects = effects;
 
@@ -518,3 +564,54 @@ pub fn resolve_commits<'repo>(
     )?;
     Ok(ResolveCommitsResult::Ok { commits })
 }
+
+#[cfg(test)]
+mod tests {
+    use crate::core::eventlog::{EventLogDb, EventReplayer};
+    use crate::core::formatting::Glyphs;
+    use crate::testing::make_git;
+
+    use super::*;
+
+    #[test]
+    fn test_get_range_with_equal_endpoints() -> eyre::Result<()> {
+        let git = make_git()?;
+        git.init_repo()?;
+
+        let test1_oid = git.commit_file("test1", 1)?;
+        let test2_oid = git.commit_file("test2", 2)?;
+
+        let effects = Effects::new_suppress_for_test(Glyphs::text());
+        let repo = git.get_repo()?;
+        let conn = repo.get_db_conn()?;
+        let event_log_db = EventLogDb::new(&conn)?;
+        let event_replayer = EventReplayer::from_event_log_db(&effects, &repo, &event_log_db)?;
+        let event_cursor = event_replayer.make_default_cursor();
+        let references_snapshot = repo.get_references_snapshot()?;
+        let dag = Dag::open_and_sync(
+            &effects,
+            &repo,
+            &event_replayer,
+            event_cursor,
+            &references_snapshot,
+        )?;
+
+        assert_eq!(
+            dag.get_range(&effects, &repo, test1_oid, test2_oid)?,
+            vec![test1_oid, test2_oid]
+        );
+        assert_eq!(
+            dag.get_range(&effects, &repo, test2_oid, test2_oid)?,
+            vec![test2_oid]
+        );
+
+        // A commit which isn't in the DAG is still an error, even if it would
+        // make up the entire range.
+        let unknown_oid: NonZeroOid = "1234567890123456789012345678901234567890".parse()?;
+        assert!(dag
+            .get_range(&effects, &repo, unknown_oid, unknown_oid)
+            .is_err());
+
+        Ok(())
+    }
+}
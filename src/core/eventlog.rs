@@ -490,8 +490,21 @@ INSERT INTO event_log VALUES (
     ///
     /// Returns: All the events in the database, ordered from oldest to newest.
     #[instrument]
-
     pub fn get_events(&self) -> eyre::Result<Vec<Event>> {
+        let mut events = Vec::new();
+        self.for_each_event(|event| {
+            events.push(event);
+            Ok(())
+        })?;
+        Ok(events)
+    }
+
+    /// Call `f` on each event in the database, ordered from oldest to newest.
+    ///
+    /// Unlike `get_events`, this reads the events from the database as they're
+    /// consumed, rather than loading all of them into memory first.
+    #[instrument(skip(f))]
+    pub fn for_each_event(&self, mut f: impl FnMut(Event) -> eyre::Result<()>) -> eyre::Result<()> {
         let mut stmt = self.conn.prepare(
             "
 SELECT timestamp, type, event_tx_id, old_ref, new_ref, ref_name, message
@@ -499,29 +512,28 @@ FROM event_log
 ORDER BY rowid ASC
 ",
         )?;
-        let rows: rusqlite::Result<Vec<Row>> = stmt
-            .query_map(rusqlite::params![], |row| {
-                let timestamp: f64 = row.get("timestamp")?;
-                let event_tx_id: isize = row.get("event_tx_id")?;
-                let type_: String = row.get("type")?;
-                let ref_name: Option<String> = row.get("ref_name")?;
-                let old_ref: Option<String> = row.get("old_ref")?;
-                let new_ref: Option<String> = row.get("new_ref")?;
-                let message: Option<String> = row.get("message")?;
-
-                Ok(Row {
-                    timestamp,
-                    event_tx_id,
-                    type_,
-                    ref_name: ref_name.map(OsString::from),
-                    ref1: old_ref.map(OsString::from),
-                    ref2: new_ref.map(OsString::from),
-                    message: message.map(OsString::from),
-                })
-            })?
-            .collect();
-        let rows = rows?;
-        rows.into_iter().map(Event::try_from).collect()
+        let mut rows = stmt.query(rusqlite::params![])?;
+        while let Some(row) = rows.next()? {
+            let timestamp: f64 = row.get("timestamp")?;
+            let event_tx_id: isize = row.get("event_tx_id")?;
+            let type_: String = row.get("type")?;
+            let ref_name: Option<String> = row.get("ref_name")?;
+            let old_ref: Option<String> = row.get("old_ref")?;
+            let new_ref: Option<String> = row.get("new_ref")?;
+            let message: Option<String> = row.get("message")?;
+
+            let row = Row {
+                timestamp,
+                event_tx_id,
+                type_,
+                ref_name: ref_name.map(OsString::from),
+                ref1: old_ref.map(OsString::from),
+                ref2: new_ref.map(OsString::from),
+                message: message.map(OsString::from),
+            };
+            f(Event::try_from(row)?)?;
+        }
+        Ok(())
     }
 
     #[instrument]
@@ -719,9 +731,10 @@ impl EventReplayer {
 
         let main_branch_reference_name = repo.get_main_branch_reference()?.get_name()?;
         let mut result = EventReplayer::new(main_branch_reference_name);
-        for event in event_log_db.get_events()? {
+        event_log_db.for_each_event(|event| {
             result.process_event(&event);
-        }
+            Ok(())
+        })?;
         Ok(result)
     }
 
@@ -899,25 +912,34 @@ impl EventReplayer {
         }
     }
 
-    fn get_cursor_commit_history(&self, cursor: EventCursor, oid: NonZeroOid) -> Vec<&EventInfo> {
-        match self.commit_history.get(&oid) {
-            None => vec![],
-            Some(history) => history
-                .iter()
-                .filter(|event_info| event_info.id < cursor.event_id)
-                .collect(),
-        }
-    }
-
-    /// Determines whether a commit is considered "active" at the cursor's point
-    /// in time.
-    pub fn get_cursor_commit_activity_status(
+    /// Get the info for the latest event affecting the given commit, as of the
+    /// cursor's point in time.
+    fn get_cursor_commit_latest_event_info(
         &self,
         cursor: EventCursor,
         oid: NonZeroOid,
-    ) -> CommitActivityStatus {
-        let history = self.get_cursor_commit_history(cursor, oid);
-        match history.last() {
+    ) -> Option<&EventInfo> {
+        let history = self.commit_history.get(&oid)?;
+        Self::get_cursor_latest_event_info(cursor, history)
+    }
+
+    /// Find the latest event in `history` which happened before the cursor.
+    ///
+    /// Events are appended to a commit's history in order of increasing ID, so
+    /// this is the last entry before the cursor. Searching from the end avoids
+    /// collecting the filtered history first.
+    fn get_cursor_latest_event_info(
+        cursor: EventCursor,
+        history: &[EventInfo],
+    ) -> Option<&EventInfo> {
+        history
+            .iter()
+            .rev()
+            .find(|event_info| event_info.id < cursor.event_id)
+    }
+
+    fn get_event_info_activity_status(event_info: Option<&EventInfo>) -> CommitActivityStatus {
+        match event_info {
             Some(EventInfo {
                 id: _,
                 event: _,
@@ -934,6 +956,37 @@ impl EventReplayer {
         }
     }
 
+    /// Determines whether a commit is considered "active" at the cursor's point
+    /// in time.
+    pub fn get_cursor_commit_activity_status(
+        &self,
+        cursor: EventCursor,
+        oid: NonZeroOid,
+    ) -> CommitActivityStatus {
+        let event_info = self.get_cursor_commit_latest_event_info(cursor, oid);
+        Self::get_event_info_activity_status(event_info)
+    }
+
+    /// Get the activity status of every commit which has been observed as of
+    /// the cursor's point in time.
+    ///
+    /// This is equivalent to calling `get_cursor_commit_activity_status` for
+    /// each OID returned by `get_cursor_oids`, but makes only a single pass
+    /// over the commit history. Commits which haven't been observed are
+    /// inactive, and are not included in the result.
+    pub fn get_cursor_commit_activity_statuses(
+        &self,
+        cursor: EventCursor,
+    ) -> HashMap<NonZeroOid, CommitActivityStatus> {
+        self.commit_history
+            .iter()
+            .filter_map(|(oid, history)| {
+                let event_info = Self::get_cursor_latest_event_info(cursor, history)?;
+                Some((*oid, Self::get_event_info_activity_status(Some(event_info))))
+            })
+            .collect()
+    }
+
     /// Get the latest event affecting a given commit, as of the cursor's point
     /// in time.
     ///
@@ -947,23 +1000,15 @@ impl EventReplayer {
         cursor: EventCursor,
         oid: NonZeroOid,
     ) -> Option<&Event> {
-        let history = self.get_cursor_commit_history(cursor, oid);
-        let event_info = *history.last()?;
+        let event_info = self.get_cursor_commit_latest_event_info(cursor, oid)?;
         Some(&event_info.event)
     }
 
     /// Get all OIDs which have been observed so far. This should be the set of
     /// non-inactive commits.
     pub fn get_cursor_oids(&self, cursor: EventCursor) -> HashSet<NonZeroOid> {
-        self.commit_history
-            .iter()
-            .filter_map(|(oid, history)| {
-                if history.iter().any(|event| event.id < cursor.event_id) {
-                    Some(*oid)
-                } else {
-                    None
-                }
-            })
+        self.get_cursor_commit_activity_statuses(cursor)
+            .into_keys()
             .collect()
     }
 
@@ -1351,6 +1396,54 @@ mod tests {
         Ok(())
     }
 
+    #[test]
+    fn test_get_cursor_commit_activity_statuses() -> eyre::Result<()> {
+        let event_tx_id = make_dummy_transaction_id(123);
+        let abc_oid = NonZeroOid::from_str("abc")?;
+        let def_oid = NonZeroOid::from_str("def")?;
+        let mut replayer = EventReplayer::new("refs/heads/master");
+        replayer.process_event(&Event::CommitEvent {
+            timestamp: 0.0,
+            event_tx_id,
+            commit_oid: abc_oid,
+        });
+        replayer.process_event(&Event::ObsoleteEvent {
+            timestamp: 0.0,
+            event_tx_id,
+            commit_oid: abc_oid,
+        });
+        replayer.process_event(&Event::CommitEvent {
+            timestamp: 0.0,
+            event_tx_id,
+            commit_oid: def_oid,
+        });
+
+        let cursor = replayer.make_cursor(1);
+        let statuses = replayer.get_cursor_commit_activity_statuses(cursor);
+        assert_eq!(statuses.len(), 1);
+        assert!(matches!(
+            statuses.get(&abc_oid),
+            Some(CommitActivityStatus::Active)
+        ));
+
+        let cursor = replayer.make_default_cursor();
+        let statuses = replayer.get_cursor_commit_activity_statuses(cursor);
+        assert_eq!(statuses.len(), 2);
+        assert!(matches!(
+            statuses.get(&abc_oid),
+            Some(CommitActivityStatus::Obsolete)
+        ));
+        assert!(matches!(
+            statuses.get(&def_oid),
+            Some(CommitActivityStatus::Active)
+        ));
+        assert!(matches!(
+            replayer.get_cursor_commit_activity_status(cursor, abc_oid),
+            CommitActivityStatus::Obsolete
+        ));
+        Ok(())
+    }
+
     #[test]
     fn test_different_event_transaction_ids() -> eyre::Result<()> {
         let git = make_git()?;
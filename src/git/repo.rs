@@ -402,6 +402,15 @@ Either create it, or update the main branch setting by running:
     #[instrument]
     pub fn get_main_branch_oid(&self) -> eyre::Result<NonZeroOid> {
         let main_branch_reference = self.get_main_branch_reference()?;
+        self.get_main_branch_reference_oid(&main_branch_reference)
+    }
+
+    /// Get the OID of the commit pointed to by the given main branch
+    /// reference, as returned by `get_main_branch_reference`.
+    fn get_main_branch_reference_oid(
+        &self,
+        main_branch_reference: &Reference,
+    ) -> eyre::Result<NonZeroOid> {
         let commit = main_branch_reference.peel_to_commit()?;
         match commit {
             Some(commit) => Ok(commit.get_oid()),
@@ -418,6 +427,19 @@ Either create it, or update the main branch setting by running:
     /// be stripped if desired.
     #[instrument]
     pub fn get_branch_oid_to_names(&self) -> eyre::Result<HashMap<NonZeroOid, HashSet<OsString>>> {
+        let main_branch_reference = self.get_main_branch_reference()?;
+        let main_branch_oid = self.get_main_branch_reference_oid(&main_branch_reference)?;
+        self.get_branch_oid_to_names_with_main_branch(&main_branch_reference, main_branch_oid)
+    }
+
+    /// Like `get_branch_oid_to_names`, but for an already-resolved main branch
+    /// reference, so that callers which also need the main branch OID don't
+    /// have to look it up again.
+    fn get_branch_oid_to_names_with_main_branch(
+        &self,
+        main_branch_reference: &Reference,
+        main_branch_oid: NonZeroOid,
+    ) -> eyre::Result<HashMap<NonZeroOid, HashSet<OsString>>> {
         let mut result: HashMap<NonZeroOid, HashSet<OsString>> = HashMap::new();
         for branch in self.get_all_local_branches()? {
             let reference = branch.into_reference();
@@ -433,8 +455,7 @@ Either create it, or update the main branch setting by running:
 
         // The main branch may be a remote branch, in which case it won't be
         // returned in the iteration above.
-        let main_branch_name = self.get_main_branch_reference()?.get_name()?;
-        let main_branch_oid = self.get_main_branch_oid()?;
+        let main_branch_name = main_branch_reference.get_name()?;
         result
             .entry(main_branch_oid)
             .or_insert_with(HashSet::new)
@@ -446,8 +467,10 @@ Either create it, or update the main branch setting by running:
     /// Get the positions of references in the repository.
     pub fn get_references_snapshot(&self) -> eyre::Result<RepoReferencesSnapshot> {
         let head_oid = self.get_head_info()?.oid;
-        let main_branch_oid = self.get_main_branch_oid()?;
-        let branch_oid_to_names = self.get_branch_oid_to_names()?;
+        let main_branch_reference = self.get_main_branch_reference()?;
+        let main_branch_oid = self.get_main_branch_reference_oid(&main_branch_reference)?;
+        let branch_oid_to_names =
+            self.get_branch_oid_to_names_with_main_branch(&main_branch_reference, main_branch_oid)?;
 
         Ok(RepoReferencesSnapshot {
             head_oid,
@@ -478,3 +478,141 @@ fn test_active_non_head_main_branch_commit() -> eyre::Result<()> {
 
     Ok(())
 }
+
+#[test]
+fn test_main_branch_fast_forwarded_to_observed_commit() -> eyre::Result<()> {
+    let git = make_git()?;
+
+    git.init_repo()?;
+    git.run(&["checkout", "-b", "feature", "master"])?;
+    git.commit_file("test1", 1)?;
+
+    {
+        let (stdout, _stderr) = git.run(&["smartlog"])?;
+        insta::assert_snapshot!(stdout, @r###"
+            O f777ecc9 (master) create initial.txt
+            |
+            @ 62fc20d2 (feature) create test1.txt
+            "###);
+    }
+
+    // The commit was already added to the DAG as a draft commit above, so
+    // this checks that it's treated as part of the main branch once the main
+    // branch points to it.
+    git.run(&["checkout", "master"])?;
+    git.run(&["merge", "--ff-only", "feature"])?;
+
+    {
+        let (stdout, _stderr) = git.run(&["smartlog"])?;
+        insta::assert_snapshot!(stdout, @r###"
+            :
+            @ 62fc20d2 (feature, master) create test1.txt
+            "###);
+    }
+
+    // Nothing has changed since the last invocation, so every head is already
+    // known to the DAG.
+    {
+        let (stdout, _stderr) = git.run(&["smartlog"])?;
+        insta::assert_snapshot!(stdout, @r###"
+            :
+            @ 62fc20d2 (feature, master) create test1.txt
+            "###);
+    }
+
+    Ok(())
+}
+
+#[test]
+fn test_long_stack() -> eyre::Result<()> {
+    let git = make_git()?;
+
+    git.init_repo()?;
+
+    // Create the stack with `git fast-import`, since committing each commit
+    // separately would take too long.
+    const NUM_COMMITS: usize = 10_000;
+    let input = {
+        let mut input = String::new();
+        for i in 1..=NUM_COMMITS {
+            let message = format!("stack commit {}", i);
+            input.push_str("commit refs/heads/stack\n");
+            input.push_str("committer Testy McTestface <test@example.com> 0 +0000\n");
+            input.push_str(&format!("data {}\n{}\n", message.len(), message));
+            if i == 1 {
+                input.push_str("from refs/heads/master\n");
+            }
+        }
+        input
+    };
+    git.run_with_options(
+        &["fast-import", "--quiet"],
+        &GitRunOptions {
+            input: Some(input),
+            ..Default::default()
+        },
+    )?;
+    git.run(&["checkout", "stack"])?;
+
+    {
+        let (stdout, _stderr) = git.run(&["smartlog"])?;
+        let lines: Vec<&str> = stdout.lines().collect();
+        assert_eq!(lines.len(), 2 * NUM_COMMITS + 1);
+        assert_eq!(lines[0], "O f777ecc9 (master) create initial.txt");
+        for (i, line) in lines.iter().enumerate().skip(1) {
+            if i % 2 == 1 {
+                assert_eq!(*line, "|");
+            } else if i / 2 < NUM_COMMITS {
+                assert!(line.starts_with("o "), "unexpected line: {:?}", line);
+                assert!(line.ends_with(&format!(" stack commit {}", i / 2)));
+            } else {
+                assert!(line.starts_with("@ "), "unexpected line: {:?}", line);
+                assert!(line.ends_with(&format!(" (stack) stack commit {}", NUM_COMMITS)));
+            }
+        }
+    }
+
+    Ok(())
+}
+
+#[test]
+fn test_nested_children_between_main_branch_commits() -> eyre::Result<()> {
+    let git = make_git()?;
+
+    git.init_repo()?;
+    git.commit_file("test1", 1)?;
+    git.detach_head()?;
+    git.commit_file("test2", 2)?;
+    git.commit_file("test3", 3)?;
+    git.run(&["checkout", "HEAD^"])?;
+    git.commit_file("test4", 4)?;
+    git.run(&["checkout", "master"])?;
+    git.detach_head()?;
+    git.commit_file("test5", 5)?;
+    git.run(&["checkout", "master"])?;
+    git.commit_file("test6", 6)?;
+
+    // `test1` has a following main branch commit, so its subtree continues
+    // the line to it past its last child. `test2` is not its parent's last
+    // child and has children of its own, so their lines are nested under its
+    // line.
+    {
+        let (stdout, _stderr) = git.run(&["smartlog"])?;
+        insta::assert_snapshot!(stdout, @r###"
+            :
+            O 62fc20d2 create test1.txt
+            |\
+            | o 96d1c37a create test2.txt
+            | |\
+            | | o 70deb1e2 create test3.txt
+            | |
+            | o f57e36f5 create test4.txt
+            |\
+            | o ea7aa064 create test5.txt
+            |
+            @ d25afe64 (master) create test6.txt
+            "###);
+    }
+
+    Ok(())
+}
@@ -1,8 +1,12 @@
+use std::ffi::OsString;
+use std::time::SystemTime;
+
 use branchless::core::effects::Effects;
 use branchless::core::eventlog::testing::{get_event_replayer_events, redact_event_timestamp};
 use branchless::core::eventlog::{Event, EventLogDb, EventReplayer};
 use branchless::core::formatting::Glyphs;
-use branchless::testing::make_git;
+use branchless::git::MaybeZeroOid;
+use branchless::testing::{make_git, GitInitOptions};
 
 #[test]
 fn test_git_v2_31_events() -> eyre::Result<()> {
@@ -138,3 +142,73 @@ fn test_git_v2_31_events() -> eyre::Result<()> {
 
     Ok(())
 }
+
+#[test]
+fn test_for_each_event() -> eyre::Result<()> {
+    let git = make_git()?;
+
+    // Don't install the hooks, so that the only events in the event log are
+    // the ones added below.
+    git.init_repo_with_options(&GitInitOptions {
+        run_branchless_init: false,
+        ..Default::default()
+    })?;
+    let test1_oid = git.commit_file("test1", 1)?;
+    let test2_oid = git.commit_file("test2", 2)?;
+
+    let repo = git.get_repo()?;
+    let conn = repo.get_db_conn()?;
+    let mut event_log_db = EventLogDb::new(&conn)?;
+    let event_tx_id = event_log_db.make_transaction_id(SystemTime::now(), "test")?;
+    let expected_events = vec![
+        Event::CommitEvent {
+            timestamp: 1.0,
+            event_tx_id,
+            commit_oid: test1_oid,
+        },
+        Event::RefUpdateEvent {
+            timestamp: 2.0,
+            event_tx_id,
+            ref_name: OsString::from("HEAD"),
+            old_oid: MaybeZeroOid::NonZero(test1_oid),
+            new_oid: MaybeZeroOid::NonZero(test2_oid),
+            message: None,
+        },
+        Event::CommitEvent {
+            timestamp: 3.0,
+            event_tx_id,
+            commit_oid: test2_oid,
+        },
+        Event::ObsoleteEvent {
+            timestamp: 4.0,
+            event_tx_id,
+            commit_oid: test1_oid,
+        },
+    ];
+    event_log_db.add_events(expected_events.clone())?;
+
+    {
+        let mut streamed_events = Vec::new();
+        event_log_db.for_each_event(|event| {
+            streamed_events.push(event);
+            Ok(())
+        })?;
+        assert_eq!(streamed_events, expected_events);
+    }
+
+    {
+        let mut streamed_events = Vec::new();
+        let result = event_log_db.for_each_event(|event| {
+            streamed_events.push(event);
+            if streamed_events.len() == 2 {
+                eyre::bail!("stop iterating");
+            }
+            Ok(())
+        });
+        let err = result.expect_err("The error from the callback should be returned");
+        assert_eq!(err.to_string(), "stop iterating");
+        assert_eq!(streamed_events, expected_events[..2]);
+    }
+
+    Ok(())
+}